@@ -1,2 +1,3 @@
 from .python_tex_tools import TexExporter
-from .plot_context_manager import make_plt_look_like_latex
\ No newline at end of file
+from .plot_context_manager import make_plt_look_like_latex
+from .notebook_exporter import NotebookExporter, get_notebook_exporter
@@ -0,0 +1,189 @@
+# Stores all variables in expl3 property lists instead of one \newcommand per
+# variable. TeX's hash table and string pool then grow with the number of name
+# prefixes, not with the number of variables. Every access of a property list
+# scans the whole list, so there is one list per name prefix, and chunks of
+# variables are only read when one of their names is used.
+import hashlib
+import os
+import shutil
+from collections import Counter
+
+# characters permitted in variable names besides ASCII letters and digits
+KEYED_NAME_SEPARATORS = "_-.:"
+
+# every access of a property list scans it, the variables are split into
+# lists by name prefix so that no list holds more than this many values
+KEYED_MAX_BUCKET_SIZE = 256
+
+KEYED_VARS_HEADER = r"""\ExplSyntaxOn
+\prop_if_exist:NF \g__pytex_chunk_prop
+  {
+    \prop_new:N \g__pytex_chunk_prop
+    \int_new:N \g__pytex_prefix_length_int
+    \int_new:N \g__pytex_chunk_length_int
+    \tl_new:N \l__pytex_file_tl
+    \tl_new:N \l__pytex_value_tl
+    \str_new:N \l__pytex_prefix_str
+    \str_new:N \l__pytex_chunk_str
+    \str_new:N \l__pytex_put_prefix_str
+    \tl_new:N \g__pytex_dir_tl
+    \cs_generate_variant:Nn \prop_gput:Nnn { Nnx }
+    \cs_generate_variant:Nn \prop_gpop:NnNT { NV }
+    \cs_generate_variant:Nn \file_input:n { V }
+    \msg_new:nnn { python_tex_tools } { unknown-var }
+      { Unknown~variable~'#1'. }
+  }
+\int_gset:Nn \g__pytex_prefix_length_int { %(prefix_length)d }
+\int_gset:Nn \g__pytex_chunk_length_int { %(chunk_length)d }
+\cs_gset_protected:Npn \PythonTexVar #1#2
+  {
+    \str_set:Nx \l__pytex_put_prefix_str
+      { \str_range:nnn {#1} {1} { \g__pytex_prefix_length_int } }
+    \prop_if_exist:cF { g__pytex_var_ \l__pytex_put_prefix_str _prop }
+      { \prop_new:c { g__pytex_var_ \l__pytex_put_prefix_str _prop } }
+    \prop_gput:cnn { g__pytex_var_ \l__pytex_put_prefix_str _prop } {#1} {#2}
+  }
+\tl_gset:Nx \g__pytex_dir_tl
+  { \cs_if_exist:NT \CurrentFilePath { \CurrentFilePath } }
+\tl_if_empty:NF \g__pytex_dir_tl { \tl_gput_right:Nn \g__pytex_dir_tl { / } }
+\cs_gset_protected:Npn \__pytex_unknown:n #1
+  {
+    \msg_warning:nnn { python_tex_tools } { unknown-var } {#1}
+    \textbf{??}
+  }
+\cs_gset_protected:Npn \%(macro)s #1
+  {
+    \str_set:Nx \l__pytex_chunk_str
+      { \str_range:nnn {#1} {1} { \g__pytex_chunk_length_int } }
+    \prop_gpop:NVNT \g__pytex_chunk_prop \l__pytex_chunk_str \l__pytex_file_tl
+      { \file_input:V \l__pytex_file_tl }
+    \str_set:Nx \l__pytex_prefix_str
+      { \str_range:nnn {#1} {1} { \g__pytex_prefix_length_int } }
+    \prop_if_exist:cTF { g__pytex_var_ \l__pytex_prefix_str _prop }
+      {
+        \prop_get:cnNTF { g__pytex_var_ \l__pytex_prefix_str _prop } {#1}
+          \l__pytex_value_tl
+          { \tl_use:N \l__pytex_value_tl }
+          { \__pytex_unknown:n {#1} }
+      }
+      { \__pytex_unknown:n {#1} }
+  }
+"""
+
+
+def check_keyed_name(name: str):
+    """Names in the keyed layout may contain letters, digits and _-.:
+
+    Args:
+        name (str): the string to check
+    """
+    if name == "" or any(
+        not (char.isascii() and char.isalnum())
+        and char not in KEYED_NAME_SEPARATORS
+        for char in name
+    ):
+        raise ValueError(
+            "Only letters, digits and the separators "
+            f"'{KEYED_NAME_SEPARATORS}' are permitted in variable names."
+        )
+
+
+def chunk_dir_name_for(var_file_name: str):
+    """Directory of the chunk files, next to the var file."""
+    return os.path.splitext(var_file_name)[0] + "_vars"
+
+
+def chunk_file_name_for(prefix: str):
+    """File name of a chunk, stable across exports and filesystems.
+
+    Derived from a hash of the prefix, so adding variables with a new prefix
+    does not rename other chunks, and prefixes that only differ in case do not
+    collide on case-insensitive filesystems.
+    """
+    return "chunk_" + hashlib.sha1(prefix.encode("utf-8")).hexdigest()[:12] + ".tex"
+
+
+def bucket_prefix_length_for(names: list, max_bucket_size: int = KEYED_MAX_BUCKET_SIZE):
+    """Shortest name prefix that splits names into property lists of at
+    most max_bucket_size values.
+
+    Args:
+        names (list): The variable names.
+        max_bucket_size (int, optional): Maximum number of values per list.
+            Defaults to KEYED_MAX_BUCKET_SIZE.
+
+    Returns:
+        int: The prefix length, at least 1.
+    """
+    max_length = max((len(name) for name in names), default=1)
+    for length in range(1, max_length + 1):
+        bucket_sizes = Counter(name[:length] for name in names)
+        if max(bucket_sizes.values(), default=0) <= max_bucket_size:
+            return length
+    # only reached for duplicate names
+    return max_length
+
+
+def write_keyed_vars(f, var_list: list, export_path, var_file_name: str,
+                     macro: str = "var", chunk_prefix_length: int = None):
+    """Write variables as a keyed lookup accessed through \\<macro>{name}.
+
+    Args:
+        f: The opened var file.
+        var_list (list): [name, value] pairs of the TexExporter.
+        export_path: Directory of the var file.
+        var_file_name (str): Name of the var file, chunks are written to the
+            directory <var_file_name without .tex>_vars next to it.
+        macro (str, optional): Name of the lookup macro. Defaults to "var".
+        chunk_prefix_length (int, optional): If set, variables are split into
+            chunk files by the first chunk_prefix_length characters of their
+            name. A chunk is only read when one of its variables is used.
+            Defaults to None (all variables in the var file).
+        The property lists are split by the name prefix returned by
+        bucket_prefix_length_for().
+
+    Returns:
+        list[str]: Paths of the written chunk files.
+    """
+    f.write(KEYED_VARS_HEADER % {
+        "macro": macro,
+        "prefix_length": bucket_prefix_length_for([name for name, _ in var_list]),
+        "chunk_length": chunk_prefix_length or 0,
+    })
+
+    if chunk_prefix_length is None:
+        f.write("\\ExplSyntaxOff\n")
+        for name, value in var_list:
+            f.write("\\PythonTexVar{" + name + "}{" + value + "}%\n")
+        return []
+
+    chunks = {}  # prefix -> lines
+    for name, value in var_list:
+        # chunks are read inside of a paragraph by the first \<macro>{name},
+        # the % keeps the line ends from adding spaces
+        chunks.setdefault(name[:chunk_prefix_length], []).append(
+            "\\PythonTexVar{" + name + "}{" + value + "}%\n"
+        )
+
+    chunk_dir_name = chunk_dir_name_for(var_file_name)
+    chunk_dir = os.path.join(export_path, chunk_dir_name)
+    # the directory is generated, stale chunks of earlier exports must go
+    if os.path.isdir(chunk_dir):
+        shutil.rmtree(chunk_dir)
+    os.makedirs(chunk_dir)
+
+    chunk_files = []
+    f.write("\\prop_gclear:N \\g__pytex_chunk_prop\n")
+    for prefix, lines in chunks.items():
+        chunk_file_name = chunk_file_name_for(prefix)
+        chunk_file_path = os.path.join(chunk_dir, chunk_file_name)
+        with open(chunk_file_path, "wt") as chunk_file:
+            chunk_file.writelines(lines)
+        chunk_files.append(chunk_file_path)
+        f.write(
+            "\\prop_gput:Nnx \\g__pytex_chunk_prop {" + prefix + "} "
+            "{ \\g__pytex_dir_tl " + chunk_dir_name + "/" + chunk_file_name
+            + " }\n"
+        )
+    f.write("\\ExplSyntaxOff\n")
+    return chunk_files
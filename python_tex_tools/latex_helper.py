@@ -0,0 +1,265 @@
+# Keeps one LaTeX process alive for the text metrics of matplotlib's pgf
+# backend. Matplotlib only remembers the last LaTeX session and its metric
+# cache dies with it, so every change of the preamble (or a new worker
+# process) pays the full LaTeX startup again.
+import hashlib
+import inspect
+import json
+import os
+import subprocess
+import tempfile
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+import matplotlib as mpl
+from matplotlib.backends import backend_pgf
+from matplotlib.backends.backend_pgf import LatexManager
+
+# The helper hooks into private parts of matplotlib's pgf backend. If they
+# changed, figures are exported with plain savefig(format="pgf").
+MATPLOTLIB_INTERNALS_AVAILABLE = (
+    isinstance(LatexManager.__dict__.get("_get_cached_or_new"), classmethod)
+    and all(
+        hasattr(LatexManager, name)
+        for name in (
+            "_build_latex_header", "_setup_latex_process", "_get_box_metrics",
+            "_stdin_writeln", "_expect", "_expect_prompt",
+        )
+    )
+    and "expect_reply" in inspect.signature(
+        LatexManager._setup_latex_process
+    ).parameters
+    and hasattr(backend_pgf, "_escape_and_apply_props")
+)
+
+
+def _finalize_latex(latex):
+    """Stop a LaTeX process (same as matplotlib's LatexManager)."""
+    latex.kill()
+    try:
+        latex.communicate()
+    except RuntimeError:
+        latex.wait()
+
+
+def _split_header(header: str):
+    """Split a LatexManager header into preamble and document part."""
+    preamble, begin, document = header.partition("\\begin{document}")
+    return preamble, begin + document
+
+
+class _HelperLatexManager(LatexManager):
+    """LatexManager starting from a precompiled format and a shared cache."""
+
+    def __init__(self, helper, header: str):
+        self.helper = helper
+        self.header = header
+        self.format_path = helper._get_format(header)
+        super().__init__()
+
+    def _setup_latex_process(self, *, expect_reply=True):
+        if self.format_path is None:
+            return super()._setup_latex_process(expect_reply=expect_reply)
+
+        texsystem = mpl.rcParams["pgf.texsystem"]
+        try:
+            self.latex = subprocess.Popen(
+                [texsystem, f"-fmt={self.format_path}", "-halt-on-error",
+                 "-no-shell-escape"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                encoding="utf-8", cwd=self.tmpdir)
+        except OSError as err:
+            raise RuntimeError(f"Error starting {texsystem!r}") from err
+
+        self._finalize_latex = weakref.finalize(
+            self, _finalize_latex, self.latex
+        )
+        # the preamble is part of the format, only start the document
+        self._stdin_writeln(_split_header(self.header)[1])
+        if expect_reply:
+            self._expect("*pgf_backend_query_start")
+            self._expect_prompt()
+
+    def _build_latex_header(self):
+        return self.header
+
+    def get_width_height_descent(self, text, prop):
+        tex = backend_pgf._escape_and_apply_props(text, prop)
+        metrics = self.helper.metrics.setdefault(self.header, {})
+        if tex not in metrics:
+            metrics[tex] = self._get_box_metrics(tex)
+            self.helper._dirty = True
+        return tuple(metrics[tex])
+
+
+class LatexHelper:
+    """A long-lived LaTeX process for figure.savefig(format="pgf").
+
+    One LaTeX session is kept per preamble and reused for all figures. The
+    preamble is compiled into a format once, and text metrics are cached by
+    string and font. Format and metric cache are stored in cache_dir, so
+    worker processes of a batch export only pay for them once.
+    """
+
+    def __init__(self, cache_dir: str = None, precompile_format: bool = True):
+        """Initializes the LaTeX helper.
+
+        Args:
+            cache_dir (str, optional): Directory for the precompiled formats
+                and the metric cache. Defaults to a directory in the system's
+                temporary directory.
+            precompile_format (bool, optional): Preload the preamble as a
+                precompiled format. Defaults to True.
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(
+                tempfile.gettempdir(), "python_tex_tools_latex_helper"
+            )
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.precompile_format = precompile_format
+
+        self.managers = {}  # header -> LatexManager
+        self.metrics = {}  # header -> {tex: (width, height, descent)}
+        self._dirty = False
+
+    def _header_hash(self, header: str):
+        texsystem = mpl.rcParams["pgf.texsystem"]
+        return hashlib.sha1(
+            (texsystem + header).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def _get_format(self, header: str):
+        """Return the path of a precompiled format (without .fmt) or None."""
+        if not self.precompile_format:
+            return None
+
+        format_name = "pgf_" + self._header_hash(header)
+        format_path = self.cache_dir / format_name
+        if (self.cache_dir / (format_name + ".fmt")).exists():
+            return str(format_path)
+
+        # workers may build the same format at once, so every process builds
+        # under its own name and moves the finished format into place
+        texsystem = mpl.rcParams["pgf.texsystem"]
+        job_name = f"{format_name}_{os.getpid()}"
+        preamble_file = self.cache_dir / (job_name + ".tex")
+        preamble_file.write_text(_split_header(header)[0], encoding="utf-8")
+        try:
+            result = subprocess.run(
+                [texsystem, "-ini", f"-jobname={job_name}",
+                 "-halt-on-error", "-interaction=nonstopmode",
+                 f"&{texsystem} {preamble_file.name}\\dump"],
+                cwd=self.cache_dir,
+                capture_output=True,
+                text=True
+            )
+        except OSError:
+            return None
+        finally:
+            for suffix in (".tex", ".log"):
+                (self.cache_dir / (job_name + suffix)).unlink(missing_ok=True)
+
+        if result.returncode != 0:
+            # e.g. fontspec fonts can not be dumped with xelatex/lualatex
+            print(
+                f"⚠ Warning: Could not precompile the preamble with "
+                f"{texsystem}, starting LaTeX without a format."
+            )
+            self.precompile_format = False
+            (self.cache_dir / (job_name + ".fmt")).unlink(missing_ok=True)
+            return None
+        os.replace(
+            self.cache_dir / (job_name + ".fmt"),
+            self.cache_dir / (format_name + ".fmt")
+        )
+        return str(format_path)
+
+    def _load_metrics(self, header: str):
+        metrics_file = self.cache_dir / f"metrics_{self._header_hash(header)}.json"
+        if metrics_file.exists():
+            with open(metrics_file, "rt", encoding="utf-8") as f:
+                self.metrics.setdefault(header, {}).update(json.load(f))
+
+    def save_metrics(self):
+        """Write the metric cache to cache_dir, merged with other processes."""
+        if not self._dirty:
+            return
+        for header, metrics in self.metrics.items():
+            metrics_file = (
+                self.cache_dir / f"metrics_{self._header_hash(header)}.json"
+            )
+            merged = {}
+            if metrics_file.exists():
+                with open(metrics_file, "rt", encoding="utf-8") as f:
+                    merged = json.load(f)
+            merged.update(metrics)
+
+            # write to a temporary file first, workers may read concurrently
+            tmp_file = metrics_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "wt", encoding="utf-8") as f:
+                json.dump(merged, f)
+            os.replace(tmp_file, metrics_file)
+        self._dirty = False
+
+    def get_manager(self):
+        """Return the LaTeX session for the current rcParams."""
+        header = LatexManager._build_latex_header()
+        if header not in self.managers:
+            self._load_metrics(header)
+            self.managers[header] = _HelperLatexManager(self, header)
+        return self.managers[header]
+
+    @contextmanager
+    def activate(self):
+        """Use this helper for all pgf exports inside the context.
+
+        If no pgf.preamble is set, the preamble of make_plt_look_like_latex
+        (text.latex.preamble) is used, so the text metrics are measured with
+        the same packages as in the document.
+        """
+        if not MATPLOTLIB_INTERNALS_AVAILABLE:
+            if not getattr(self, "_warned_internals", False):
+                print(
+                    "⚠ Warning: The pgf backend of this matplotlib version is "
+                    "not supported by the LaTeX helper, using plain savefig."
+                )
+                self._warned_internals = True
+            yield self
+            return
+
+        rc = {}
+        if not mpl.rcParams["pgf.preamble"]:
+            rc["pgf.preamble"] = mpl.rcParams["text.latex.preamble"]
+
+        original = LatexManager.__dict__["_get_cached_or_new"]
+        with mpl.rc_context(rc):
+            LatexManager._get_cached_or_new = classmethod(
+                lambda cls: self.get_manager()
+            )
+            try:
+                yield self
+            finally:
+                LatexManager._get_cached_or_new = original
+                self.save_metrics()
+
+    def close(self):
+        """Stop all LaTeX processes and save the metric cache."""
+        self.save_metrics()
+        for manager in self.managers.values():
+            if getattr(manager, "latex", None) is not None:
+                manager._finalize_latex()
+                manager.latex = None
+        self.managers = {}
+
+
+_shared_helper = None
+
+
+def get_latex_helper(cache_dir: str = None):
+    """Return the LatexHelper shared by all TexExporters of this process."""
+    global _shared_helper
+    if _shared_helper is None:
+        _shared_helper = LatexHelper(cache_dir=cache_dir)
+    return _shared_helper
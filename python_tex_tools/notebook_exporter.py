@@ -0,0 +1,349 @@
+# A TexExporter that lives as long as the notebook kernel. Re-running a cell
+# replaces the entries of that cell instead of starting from scratch, only
+# changed entries mark the export as outdated, and the export runs in the
+# background once the notebook is idle.
+import hashlib
+import inspect
+import shutil
+import threading
+import weakref
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+IPYTHON_AVAILABLE = True
+try:
+    from IPython import get_ipython
+except ImportError:
+    IPYTHON_AVAILABLE = False
+
+from .python_tex_tools import TexExporter
+from .tex_cost import read_entry_code
+
+
+def _figure_fingerprint(figure: plt.figure):
+    """Hash the artist properties of a figure without rendering it.
+
+    This is a heuristic, properties that are not hashed here do not change
+    the fingerprint. It is therefore only used by the opt-in cache for
+    figures exported with the pgf backend.
+    """
+    fingerprint = hashlib.sha1()
+
+    def update(*values):
+        for value in values:
+            if isinstance(value, np.ndarray):
+                fingerprint.update(np.ascontiguousarray(value).tobytes())
+            else:
+                fingerprint.update(repr(value).encode("utf-8"))
+
+    def update_artist(artist):
+        update(
+            type(artist).__name__, artist.get_visible(), artist.get_alpha(),
+            artist.get_zorder(), artist.get_label(),
+        )
+
+    def update_text(text):
+        update_artist(text)
+        update(
+            text.get_text(), text.get_position(), text.get_color(),
+            text.get_fontsize(), text.get_rotation(), text.get_usetex(),
+        )
+
+    update(
+        tuple(figure.get_size_inches()), figure.dpi,
+        # the pgf backend reads fonts and preamble from the rcParams
+        sorted(
+            (key, value) for key, value in mpl.rcParams.items()
+            if key.startswith(("pgf.", "font.", "text."))
+        ),
+    )
+    for text in figure.texts:
+        update_text(text)
+    for ax in figure.get_axes():
+        update(
+            ax.name, ax.get_position().bounds, ax.get_xlim(), ax.get_ylim(),
+            ax.get_xscale(), ax.get_yscale(), ax.axison,
+        )
+        update_text(ax.title)
+        for axis in (ax.xaxis, ax.yaxis):
+            update_text(axis.label)
+            ticks = list(axis.get_majorticklocs())
+            update(
+                ticks,
+                axis.get_major_formatter().format_ticks(ticks),
+                list(axis.get_minorticklocs()),
+                [line.get_visible() for line in axis.get_gridlines()],
+            )
+        legend = ax.get_legend()
+        if legend is not None:
+            update(legend._loc, [t.get_text() for t in legend.get_texts()])
+        for line in ax.lines:
+            update_artist(line)
+            update(
+                np.asarray(line.get_xydata(), dtype=float), line.get_color(),
+                line.get_linestyle(), line.get_linewidth(), line.get_marker(),
+                line.get_markersize(), line.get_drawstyle(),
+                line.get_markerfacecolor(), line.get_markeredgecolor(),
+            )
+        for collection in ax.collections:
+            update_artist(collection)
+            update(
+                np.asarray(collection.get_offsets(), dtype=float),
+                np.asarray(collection.get_facecolors()),
+                np.asarray(collection.get_edgecolors()),
+                np.asarray(collection.get_linewidths()),
+                np.asarray(collection.get_sizes()) if hasattr(collection, "get_sizes") else None,
+                [np.asarray(path.vertices) for path in collection.get_paths()],
+            )
+        for patch in ax.patches:
+            update_artist(patch)
+            update(
+                np.asarray(patch.get_verts()), patch.get_facecolor(),
+                patch.get_edgecolor(), patch.get_linewidth(),
+                patch.get_linestyle(), patch.get_hatch(),
+            )
+        for text in ax.texts:
+            update_text(text)
+        for image in ax.images:
+            update_artist(image)
+            update(
+                np.asarray(image.get_array()), image.get_extent(),
+                image.get_cmap().name, image.get_clim(),
+            )
+    return fingerprint.hexdigest()
+
+
+class NotebookExporter(TexExporter):
+    """
+    Session scoped TexExporter for Jupyter notebooks. Use
+    get_notebook_exporter() to get the instance of the running kernel, so
+    re-executed cells update their entries instead of creating a new exporter.
+    """
+
+    def __init__(self, auto_export=True, debounce=2.0, export_kwargs: dict = None, cache_pgf_figures=False, **kwargs) -> None:
+        """Initializes the notebook exporter.
+
+        Args:
+            auto_export (bool, optional): Export in the background after each
+             cell that changed an entry. Defaults to True.
+            debounce (float, optional): Seconds without cell executions before
+             the background export starts. Defaults to 2.0.
+            export_kwargs (dict, optional): Arguments for export(), e.g.
+             export_path. Defaults to None.
+            cache_pgf_figures (bool, optional): Skip re-rendering figures that
+             need the pgf backend if a fingerprint of their artists did not
+             change. The fingerprint does not cover every artist property, so
+             some changes are missed. Without it, every figure is rendered and
+             compared by its generated code. Defaults to False.
+            kwargs: Passed on to TexExporter.
+        """
+        super().__init__(**kwargs)
+        # also runs at interpreter shutdown, when __del__ can not clean up
+        self._finalize_tmp_dir = weakref.finalize(
+            self, shutil.rmtree, self.tmp_dir, ignore_errors=True
+        )
+        self.export_kwargs = {} if export_kwargs is None else export_kwargs
+        self.debounce = debounce
+        self.cache_pgf_figures = cache_pgf_figures
+        self.fig_fingerprints = {}  # Name; Fingerprint of the pgf figure
+        self.dirty = False
+        self.closed = False
+        self.lock = threading.RLock()
+        self.timer = None
+
+        self.ipython = get_ipython() if IPYTHON_AVAILABLE else None
+        self.auto_export = auto_export and self.ipython is not None
+        if self.auto_export:
+            self.ipython.events.register("post_run_cell", self._post_run_cell)
+
+    def _check_open(self):
+        if self.closed:
+            raise RuntimeError(
+                "The notebook exporter was closed. Use get_notebook_exporter() "
+                "to create a new one."
+            )
+
+    def _replace_entry(self, entry_list: list, name: str, add_entry):
+        """Add an entry via add_entry, replacing an entry with the same name."""
+        with self.lock:
+            self._check_open()
+            index = next(
+                (i for i, e in enumerate(entry_list) if e[0] == name), None
+            )
+            old_entry = entry_list.pop(index) if index is not None else None
+            # figures are files that are overwritten, compare their content
+            old_code = (
+                read_entry_code(old_entry[1]) if old_entry is not None else None
+            )
+            try:
+                add_entry()
+            except Exception:
+                if old_entry is not None:
+                    entry_list.insert(index, old_entry)
+                raise
+
+            if index is not None:
+                # keep the position of the entry in the exported file
+                entry_list.insert(index, entry_list.pop())
+            new_entry = entry_list[index if index is not None else -1]
+            if old_entry is None or old_entry[0] != new_entry[0] \
+                    or old_code != read_entry_code(new_entry[1]):
+                self.dirty = True
+
+    def add_var(self, name, value, unit_name=""):
+        self._replace_entry(
+            self.var_list, name,
+            lambda: super(NotebookExporter, self).add_var(name, value, unit_name)
+        )
+
+    # add_figure() of TexExporter dispatches to the methods below, so every
+    # path replaces the entry of an earlier execution of the cell
+    def add_figure_native(self, name: str, figure: plt.figure):
+        self._replace_entry(
+            self.fig_list, name,
+            lambda: super(NotebookExporter, self).add_figure_native(name, figure)
+        )
+        self.fig_fingerprints.pop(name, None)
+
+    def add_figure_tikzplotlib(self, name: str, figure: plt.figure, tikzplotlib_params=None):
+        self._replace_entry(
+            self.fig_list, name,
+            lambda: super(NotebookExporter, self).add_figure_tikzplotlib(
+                name, figure, tikzplotlib_params
+            )
+        )
+        self.fig_fingerprints.pop(name, None)
+
+    def add_figure_pgfplots(self, name: str, figure: plt.figure):
+        with self.lock:
+            self._check_open()
+            fingerprint = _figure_fingerprint(figure) if self.cache_pgf_figures else None
+            if fingerprint is not None and self.fig_fingerprints.get(name) == fingerprint:
+                if self.verbose:
+                    print(f"Figure {name} unchanged, not rendered again.")
+                return
+            self._replace_entry(
+                self.fig_list, name,
+                lambda: super(NotebookExporter, self).add_figure_pgfplots(name, figure)
+            )
+            if fingerprint is not None:
+                self.fig_fingerprints[name] = fingerprint
+
+    def add_table(self, name: str, table: pd.DataFrame, print_best_values_bf: bool = True, bf_options: dict = None):
+        self._replace_entry(
+            self.tab_list, name,
+            lambda: super(NotebookExporter, self).add_table(
+                name, table, print_best_values_bf, bf_options
+            )
+        )
+
+    def remove(self, name: str):
+        """Remove the variable, figure or table with the given name."""
+        with self.lock:
+            self._check_open()
+            for entry_list in (self.var_list, self.fig_list, self.tab_list):
+                for e in [e for e in entry_list if e[0] == name]:
+                    entry_list.remove(e)
+                    self.dirty = True
+            self.fig_fingerprints.pop(name, None)
+
+    def _post_run_cell(self, result=None):
+        if not self.dirty:
+            return
+        # restart the timer, only export once the notebook is idle
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = threading.Timer(self.debounce, self._export_in_background)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _export_in_background(self):
+        with self.lock:
+            if not self.dirty or self.closed:
+                return
+            try:
+                self.export(**self.export_kwargs)
+            except Exception as e:
+                print(f"⚠ Warning: Background export failed: {e}")
+
+    def export(self, *args, **kwargs):
+        """Export like TexExporter.export(), never at the same time as the
+        background export. A pending background export is cancelled."""
+        with self.lock:
+            self._check_open()
+            if self.timer is not None:
+                self.timer.cancel()
+            super().export(*args, **kwargs)
+            self.dirty = False
+
+    def close(self):
+        """Stop the background export and remove the temporary directory.
+
+        The exporter can not be used afterwards.
+        """
+        global _session_exporter
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            if self.auto_export:
+                self.ipython.events.unregister("post_run_cell", self._post_run_cell)
+                self.auto_export = False
+            self._finalize_tmp_dir()
+            self.closed = True
+        if _session_exporter is self:
+            _session_exporter = None
+
+    def __del__(self):
+        # the temporary directory is removed by _finalize_tmp_dir
+        pass
+
+
+_session_exporter = None
+_session_kwargs = {}
+
+
+def _default_kwargs():
+    """Default arguments of NotebookExporter and TexExporter."""
+    defaults = {}
+    for cls in (TexExporter, NotebookExporter):
+        for name, parameter in inspect.signature(cls.__init__).parameters.items():
+            if parameter.default is not inspect.Parameter.empty:
+                defaults[name] = parameter.default
+    return defaults
+
+
+def get_notebook_exporter(**kwargs):
+    """Return the NotebookExporter of the running kernel.
+
+    The first call creates the exporter with the given arguments (see
+    NotebookExporter). Later calls return the same instance and only update
+    export_kwargs and debounce, so a cell can be re-run safely. Call close()
+    on the exporter to create a new one with other arguments.
+    """
+    global _session_exporter, _session_kwargs
+    if _session_exporter is None:
+        _session_exporter = NotebookExporter(**kwargs)
+        _session_kwargs = kwargs
+        return _session_exporter
+
+    if "export_kwargs" in kwargs:
+        _session_exporter.export_kwargs = kwargs["export_kwargs"]
+    if "debounce" in kwargs:
+        _session_exporter.debounce = kwargs["debounce"]
+
+    defaults = _default_kwargs()
+    ignored = [
+        key for key, value in kwargs.items()
+        if key not in ("export_kwargs", "debounce")
+        and _session_kwargs.get(key, defaults.get(key)) != value
+    ]
+    if len(ignored) > 0:
+        print(
+            f"⚠ Warning: The notebook exporter already exists, ignoring "
+            f"changed arguments {ignored}. Call close() on it first to "
+            f"apply them."
+        )
+    return _session_exporter
@@ -0,0 +1,498 @@
+# Writes pgfplots code directly from the artists of a matplotlib figure.
+# In contrast to figure.savefig(format="pgf"), no LaTeX process is started to
+# measure text. All text is escaped like in the pgf backend and typeset by the
+# final document.
+import math
+import re
+
+import matplotlib as mpl
+import numpy as np
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.colors import to_rgba
+from matplotlib.container import BarContainer, ErrorbarContainer
+from matplotlib.lines import Line2D
+from matplotlib.markers import MarkerStyle
+from matplotlib.patches import Rectangle
+from matplotlib.ticker import (
+    AutoLocator,
+    FixedFormatter,
+    FixedLocator,
+    LogFormatterSciNotation,
+    LogLocator,
+    NullLocator,
+    ScalarFormatter,
+)
+
+try:
+    from matplotlib.category import StrCategoryFormatter, StrCategoryLocator
+    EXPLICIT_TICK_FORMATTERS = (FixedFormatter, StrCategoryFormatter)
+    EXPLICIT_TICK_LOCATORS = (FixedLocator, StrCategoryLocator)
+except ImportError:
+    EXPLICIT_TICK_FORMATTERS = (FixedFormatter,)
+    EXPLICIT_TICK_LOCATORS = (FixedLocator,)
+
+# locators and formatters of a scale whose ticks pgfplots places the same way
+DEFAULT_TICKS = {
+    "linear": (AutoLocator, ScalarFormatter, NullLocator),
+    "log": (LogLocator, LogFormatterSciNotation, LogLocator),
+}
+
+NUMBER_FORMAT = "{:.6g}"
+
+LINE_STYLES = {
+    "-": "solid",
+    "--": "dashed",
+    ":": "dotted",
+    "-.": "dashdotted",
+}
+
+MARKERS = {
+    "o": "*",
+    ".": "*",
+    "s": "square*",
+    "^": "triangle*",
+    "D": "diamond*",
+    "d": "diamond*",
+    "x": "x",
+    "+": "+",
+    "*": "asterisk",
+    "|": "|",
+    "_": "-",
+}
+
+# marks drawn without fill, e.g. for mfc="none"
+UNFILLED_MARKS = {
+    "*": "o",
+    "square*": "square",
+    "triangle*": "triangle",
+    "diamond*": "diamond",
+}
+
+# special characters of TeX outside math mode
+TEX_ESCAPES = {
+    "\\": r"\textbackslash{}",
+    "{": r"\{",
+    "}": r"\}",
+    "_": r"\_",
+    "%": r"\%",
+    "#": r"\#",
+    "&": r"\&",
+    "^": r"\^{}",
+    "~": r"\textasciitilde{}",
+    "$": r"\$",
+    "\N{MINUS SIGN}": r"\ensuremath{-}",
+}
+TEX_ESCAPE_REGEX = re.compile("|".join(re.escape(c) for c in TEX_ESCAPES))
+# unescaped $ delimit math in matplotlib text
+MATH_DELIMITER_REGEX = re.compile(r"(?<!\\)\$")
+
+# legend._loc codes -> pgfplots legend position
+LEGEND_POSITIONS = {
+    1: "legend pos=north east",
+    2: "legend pos=north west",
+    3: "legend pos=south west",
+    4: "legend pos=south east",
+}
+
+
+def _fmt(value: float):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "nan"
+    return NUMBER_FORMAT.format(value)
+
+
+def _tex_text(text: str, usetex: bool = None):
+    """Escape text for TeX like the pgf backend does.
+
+    With usetex, text is TeX already and written as is. Otherwise, special
+    characters outside of $...$ are escaped and math is kept.
+    """
+    if usetex is None:
+        usetex = mpl.rcParams["text.usetex"]
+    if usetex:
+        return text
+
+    parts = MATH_DELIMITER_REGEX.split(text)
+    if len(parts) % 2 == 0:
+        # unbalanced $, matplotlib renders everything as text
+        parts = [text]
+    escaped = []
+    for i, part in enumerate(parts):
+        if i % 2 == 1:
+            escaped.append("$" + part + "$")
+        else:
+            part = part.replace("\\$", "$")
+            escaped.append(
+                TEX_ESCAPE_REGEX.sub(lambda m: TEX_ESCAPES[m.group(0)], part)
+            )
+    return "".join(escaped)
+
+
+def _color(color, alpha: float = None):
+    """Convert a matplotlib color to xcolor options (color and opacity)."""
+    r, g, b, a = to_rgba(color, alpha)
+    spec = f"{{rgb,1:red,{r:.4g};green,{g:.4g};blue,{b:.4g}}}"
+    return spec, a
+
+
+def _coordinates(xy):
+    return " ".join(f"({_fmt(x)},{_fmt(y)})" for x, y in xy)
+
+
+def _line_options(line: Line2D):
+    if line.get_drawstyle() != "default":
+        raise NotImplementedError(
+            f"Unsupported draw style {line.get_drawstyle()!r}."
+        )
+    color, alpha = _color(line.get_color(), line.get_alpha())
+    options = [f"color={color}"]
+    if alpha < 1:
+        options.append(f"opacity={alpha:.3g}")
+
+    linestyle = line.get_linestyle()
+    if linestyle in ("None", "none", " ", ""):
+        options.append("only marks")
+    elif linestyle in LINE_STYLES:
+        options.append(LINE_STYLES[linestyle])
+        options.append(f"line width={line.get_linewidth():.3g}pt")
+    else:
+        raise NotImplementedError(f"Unsupported line style {linestyle!r}.")
+
+    marker = line.get_marker()
+    if marker in ("None", "none", " ", "", None):
+        options.append("no markers")
+    elif marker in MARKERS:
+        if line.get_fillstyle() not in ("full", "none"):
+            raise NotImplementedError(
+                f"Unsupported marker fill style {line.get_fillstyle()!r}."
+            )
+        mark = MARKERS[marker]
+        mark_options = ["solid"]
+        face = line.get_markerfacecolor()
+        if line.get_fillstyle() == "none" or (isinstance(face, str) and face.lower() == "none"):
+            mark = UNFILLED_MARKS.get(mark, mark)
+        elif mark in UNFILLED_MARKS:
+            fill, fill_alpha = _color(face, line.get_alpha())
+            mark_options.append(f"fill={fill}")
+            if fill_alpha < 1:
+                mark_options.append(f"fill opacity={fill_alpha:.3g}")
+        edge = line.get_markeredgecolor()
+        if isinstance(edge, str) and edge.lower() == "none":
+            mark_options.append("draw=none")
+        else:
+            draw, draw_alpha = _color(edge, line.get_alpha())
+            mark_options.append(f"draw={draw}")
+            if draw_alpha < 1:
+                mark_options.append(f"draw opacity={draw_alpha:.3g}")
+        options.append(f"mark={mark}")
+        options.append(f"mark size={line.get_markersize() / 2:.3g}pt")
+        options.append(f"mark options={{{', '.join(mark_options)}}}")
+    else:
+        raise NotImplementedError(f"Unsupported marker {marker!r}.")
+    return options
+
+
+def _scatter_marker(collection: PathCollection):
+    """Find the pgfplots mark of a scatter plot from its marker path."""
+    paths = collection.get_paths()
+    if len(paths) != 1:
+        raise NotImplementedError("Only scatter plots with a single marker are supported.")
+    vertices = paths[0].vertices
+    for marker, mark in MARKERS.items():
+        # ax.scatter stores the marker path in the same way
+        marker_style = MarkerStyle(marker)
+        marker_vertices = marker_style.get_path().transformed(
+            marker_style.get_transform()
+        ).vertices
+        if marker_vertices.shape == vertices.shape and np.allclose(marker_vertices, vertices):
+            return mark
+    raise NotImplementedError("Unsupported scatter marker.")
+
+
+def _scatter_options(collection: PathCollection):
+    if collection.get_array() is not None:
+        # the colors of colormapped plots are only set when drawing
+        raise NotImplementedError("Unsupported colormapped scatter plot.")
+    facecolors = collection.get_facecolors()
+    if len(facecolors) == 0 or len(np.unique(facecolors, axis=0)) > 1:
+        raise NotImplementedError("Only single colored scatter plots are supported.")
+    sizes = collection.get_sizes()
+    if len(np.unique(sizes)) > 1:
+        raise NotImplementedError("Only scatter plots with a single marker size are supported.")
+
+    color, alpha = _color(facecolors[0])
+    options = ["only marks", f"mark={_scatter_marker(collection)}", f"color={color}"]
+    if alpha < 1:
+        options.append(f"opacity={alpha:.3g}")
+    if len(sizes) > 0:
+        # sizes are given as area in points^2, pgfplots expects the radius
+        options.append(f"mark size={math.sqrt(sizes[0]) / 2:.3g}pt")
+    return options
+
+
+def _patch_options(patch: Rectangle):
+    fill, fill_alpha = _color(patch.get_facecolor())
+    options = [f"fill={fill}"]
+    if fill_alpha < 1:
+        options.append(f"fill opacity={fill_alpha:.3g}")
+    draw, draw_alpha = _color(patch.get_edgecolor())
+    if patch.get_linewidth() > 0 and draw_alpha > 0:
+        options.append(f"draw={draw}")
+        options.append(f"line width={patch.get_linewidth():.3g}pt")
+    else:
+        options.append("draw=none")
+    return options
+
+
+def _line_collection_options(collection: LineCollection):
+    colors = collection.get_colors()
+    if len(colors) == 0:
+        raise NotImplementedError("Unsupported line collection without color.")
+    color, alpha = _color(colors[0])
+    options = [
+        f"color={color}",
+        f"line width={collection.get_linewidths()[0]:.3g}pt",
+        "no markers",
+    ]
+    if alpha < 1:
+        options.append(f"opacity={alpha:.3g}")
+    return options
+
+
+def _legend_image(handle):
+    """Options of \\addlegendimage for a handle drawn by the legend."""
+    if isinstance(handle, Line2D):
+        return _line_options(handle)
+    if isinstance(handle, PathCollection):
+        return _scatter_options(handle)
+    if isinstance(handle, LineCollection):
+        # error bars without their data line
+        return _line_collection_options(handle)
+    if isinstance(handle, Rectangle):
+        return ["area legend"] + _patch_options(handle)
+    # None if matplotlib has no legend handler for the artist
+    raise NotImplementedError(f"Unsupported legend handle {type(handle).__name__}.")
+
+
+def _tick_options(axis, name: str):
+    """Tick options, explicit ticks if they are not placed by pgfplots.
+
+    Raises NotImplementedError for locators and formatters whose ticks
+    pgfplots can not reproduce (e.g. dates or percent).
+    """
+    scale = axis.get_scale()
+    if scale not in DEFAULT_TICKS:
+        raise NotImplementedError(f"Unsupported {name} axis scale {scale!r}.")
+    default_locator, default_formatter, default_minor_locator = DEFAULT_TICKS[scale]
+    locator = axis.get_major_locator()
+    formatter = axis.get_major_formatter()
+    if type(axis.get_minor_locator()) is not default_minor_locator:
+        raise NotImplementedError(f"Unsupported {name} minor ticks.")
+
+    if type(locator) is NullLocator:
+        return [f"{name}tick=\\empty"]
+    if type(locator) is default_locator:
+        if type(formatter) is not default_formatter:
+            raise NotImplementedError(
+                f"Unsupported {name} tick formatter {type(formatter).__name__}."
+            )
+        # pgfplots places and formats the ticks itself
+        return []
+    if not isinstance(locator, EXPLICIT_TICK_LOCATORS):
+        raise NotImplementedError(
+            f"Unsupported {name} tick locator {type(locator).__name__}."
+        )
+
+    ticks = list(axis.get_majorticklocs())
+    if len(ticks) == 0:
+        return [f"{name}tick=\\empty"]
+    options = [f"{name}tick={{{','.join(_fmt(t) for t in ticks)}}}"]
+    if isinstance(formatter, EXPLICIT_TICK_FORMATTERS):
+        labels = [_tex_text(label) for label in formatter.format_ticks(ticks)]
+        options.append(
+            f"{name}ticklabels={{{','.join('{' + l + '}' for l in labels)}}}"
+        )
+    elif type(formatter) is not default_formatter:
+        raise NotImplementedError(
+            f"Unsupported {name} tick formatter {type(formatter).__name__}."
+        )
+    return options
+
+
+def _check_supported(ax):
+    if ax.name != "rectilinear":
+        raise NotImplementedError(f"Unsupported axes projection {ax.name!r}.")
+    # every axes is written on its own, shared limits and twinned axes with
+    # their ticks on the opposite side are not reproduced
+    if len(ax.get_shared_x_axes().get_siblings(ax)) > 1 \
+            or len(ax.get_shared_y_axes().get_siblings(ax)) > 1:
+        raise NotImplementedError("Unsupported shared or twinned axes.")
+    for artist_list, kind in (
+        (ax.texts, "text"),
+        (ax.images, "image"),
+        (ax.tables, "table"),
+        (ax.artists, "artist"),
+    ):
+        if len(artist_list) > 0:
+            raise NotImplementedError(f"Unsupported artist: {kind}.")
+    for collection in ax.collections:
+        if not isinstance(collection, (PathCollection, LineCollection)):
+            raise NotImplementedError(
+                f"Unsupported collection {type(collection).__name__}."
+            )
+        if collection.get_array() is not None:
+            raise NotImplementedError("Unsupported colormapped collection.")
+    for container in ax.containers:
+        if isinstance(container, BarContainer) and len(container.patches) == 0:
+            raise NotImplementedError("Unsupported empty bar plot.")
+        if isinstance(container, ErrorbarContainer) and container.lines[0] is None:
+            raise NotImplementedError("Unsupported error bars without data line.")
+    # all coordinates are written as data coordinates, so artists in other
+    # coordinate systems (e.g. axhline, axvline, axhspan) are not supported
+    for line in ax.lines:
+        if line.get_transform() is not ax.transData:
+            raise NotImplementedError("Unsupported line in non-data coordinates.")
+    for collection in ax.collections:
+        data_transform = (
+            collection.get_offset_transform()
+            if isinstance(collection, PathCollection)
+            else collection.get_transform()
+        )
+        if data_transform is not ax.transData:
+            raise NotImplementedError("Unsupported collection in non-data coordinates.")
+    for patch in ax.patches:
+        if type(patch) is not Rectangle:
+            raise NotImplementedError(f"Unsupported patch {type(patch).__name__}.")
+        if patch.get_data_transform() is not ax.transData:
+            raise NotImplementedError("Unsupported patch in non-data coordinates.")
+
+
+def _axis_code(ax, figure_size):
+    _check_supported(ax)
+
+    fig_width, fig_height = figure_size
+    x0, y0, width, height = ax.get_position().bounds
+    xmin, xmax = ax.get_xlim()
+    ymin, ymax = ax.get_ylim()
+
+    options = [
+        f"at={{({x0 * fig_width:.4g}in,{y0 * fig_height:.4g}in)}}",
+        "anchor=south west",
+        "scale only axis",
+        f"width={width * fig_width:.4g}in",
+        f"height={height * fig_height:.4g}in",
+        f"xmin={_fmt(min(xmin, xmax))}, xmax={_fmt(max(xmin, xmax))}",
+        f"ymin={_fmt(min(ymin, ymax))}, ymax={_fmt(max(ymin, ymax))}",
+        "unbounded coords=jump",
+    ]
+    if xmin > xmax:
+        options.append("x dir=reverse")
+    if ymin > ymax:
+        options.append("y dir=reverse")
+    for axis, name in ((ax.xaxis, "x"), (ax.yaxis, "y")):
+        if axis.get_scale() == "log":
+            options.append(f"{name}mode=log")
+            base = axis.get_transform().base
+            if base != 10:
+                options.append(f"log basis {name}={_fmt(base)}")
+    if any(line.get_visible() for line in ax.xaxis.get_gridlines()):
+        options.append("xmajorgrids")
+    if any(line.get_visible() for line in ax.yaxis.get_gridlines()):
+        options.append("ymajorgrids")
+    if not ax.axison:
+        options.append("hide axis")
+    if ax.get_title():
+        options.append(f"title={{{_tex_text(ax.get_title(), ax.title.get_usetex())}}}")
+    if ax.get_xlabel():
+        options.append(
+            f"xlabel={{{_tex_text(ax.get_xlabel(), ax.xaxis.label.get_usetex())}}}"
+        )
+    if ax.get_ylabel():
+        options.append(
+            f"ylabel={{{_tex_text(ax.get_ylabel(), ax.yaxis.label.get_usetex())}}}"
+        )
+    options += _tick_options(ax.xaxis, "x")
+    options += _tick_options(ax.yaxis, "y")
+
+    legend = ax.get_legend()
+    if legend is not None:
+        options.append(LEGEND_POSITIONS.get(legend._loc, "legend pos=north east"))
+
+    lines = ["\\begin{axis}[", ",\n".join(options), "]"]
+
+    # patches first, matplotlib draws them below lines by default (zorder)
+    for patch in ax.patches:
+        if not patch.get_visible():
+            continue
+        px, py = patch.get_xy()
+        pw, ph = patch.get_width(), patch.get_height()
+        lines.append(
+            f"\\draw[{', '.join(_patch_options(patch))}] "
+            f"(axis cs:{_fmt(px)},{_fmt(py)}) rectangle "
+            f"(axis cs:{_fmt(px + pw)},{_fmt(py + ph)});"
+        )
+
+    for collection in ax.collections:
+        if not collection.get_visible():
+            continue
+        if isinstance(collection, LineCollection):
+            # e.g. the error bars of ax.errorbar()
+            options = ", ".join(_line_collection_options(collection))
+            for segment in collection.get_segments():
+                lines.append(
+                    f"\\addplot[{options}, forget plot] coordinates "
+                    f"{{{_coordinates(segment)}}};"
+                )
+        else:
+            lines.append(
+                f"\\addplot[{', '.join(_scatter_options(collection))}, "
+                f"forget plot] coordinates "
+                f"{{{_coordinates(collection.get_offsets())}}};"
+            )
+
+    for line in ax.lines:
+        if not line.get_visible():
+            continue
+        lines.append(
+            f"\\addplot[{', '.join(_line_options(line))}, forget plot] "
+            f"coordinates {{{_coordinates(line.get_xydata())}}};"
+        )
+
+    if legend is not None:
+        # the entries of the legend itself, e.g. ax.legend(["a", "b"])
+        handles = (
+            legend.legend_handles if hasattr(legend, "legend_handles")
+            else legend.legendHandles
+        )
+        for handle, text in zip(handles, legend.get_texts()):
+            lines.append(f"\\addlegendimage{{{', '.join(_legend_image(handle))}}}")
+            lines.append(
+                f"\\addlegendentry{{{_tex_text(text.get_text(), text.get_usetex())}}}"
+            )
+
+    lines.append("\\end{axis}")
+    return "\n".join(lines)
+
+
+def get_pgfplots_code(figure):
+    """Write the pgfplots code of a matplotlib figure without LaTeX.
+
+    Supports lines, scatter plots, bar plots, error bars, labels, titles and
+    legends. Raises NotImplementedError for all other artists, so the caller
+    can fall back to the pgf backend.
+
+    Args:
+        figure (plt.figure): The figure to convert.
+
+    Returns:
+        str: A tikzpicture environment with one axis per subplot.
+    """
+    if len(figure.texts) > 0 or len(figure.legends) > 0:
+        raise NotImplementedError("Unsupported artist: figure text or legend.")
+
+    figure_size = figure.get_size_inches()
+    code = ["\\begin{tikzpicture}"]
+    for ax in figure.get_axes():
+        code.append(_axis_code(ax, figure_size))
+    code.append("\\end{tikzpicture}")
+    return "\n".join(code)
@@ -18,6 +18,10 @@ import tempfile
 import shutil
 from pathlib import Path
 from .utils import print_best_values_fat
+from .pgfplots_writer import get_pgfplots_code
+from .latex_helper import get_latex_helper
+from .keyed_vars import check_keyed_name, write_keyed_vars, chunk_dir_name_for
+from .tex_cost import estimate_tex_cost, read_entry_code, check_cost_budget
 import pandas as pd
 import sys
 
@@ -29,7 +33,13 @@ class TexExporter:
     a .tex file which only needs to be included in your tex project.
     """
 
-    def __init__(self, verbose=False) -> None:
+    def __init__(
+        self,
+        verbose=False,
+        persistent_latex=False,
+        var_layout="commands",
+        var_chunk_prefix_length=None
+    ) -> None:
         """Initializes the tex_exporter class.
 
         Args:
@@ -39,7 +49,22 @@ class TexExporter:
              Defaults to None.
             var_file_name (str, optional): Defines the name of the latex file, holding
              the vairables. Defaults to python_results.tex.
+            persistent_latex (bool, optional): Reuse one LaTeX process (with a
+             precompiled preamble and cached text metrics) for all pgf figure
+             exports instead of starting LaTeX per preamble. Defaults to False.
+            var_layout (str, optional): "commands" exports every variable as its
+             own \\var<Name> command. "keyed" stores all variables in expl3
+             property lists, accessed by \\var{name}; names may then
+             contain digits and the separators _-.: (e.g. run IDs).
+             Defaults to "commands".
+            var_chunk_prefix_length (int, optional): Only for the "keyed"
+             layout. Splits the variables into files by the first characters
+             of their names, which are only loaded by TeX when used.
+             Defaults to None (no chunks).
         """
+        if var_layout not in ("commands", "keyed"):
+            raise ValueError("var_layout must be either 'commands' or 'keyed'.")
+
        
         # make a temporary directory
         self.tmp_dir = tempfile.mkdtemp()
@@ -53,6 +78,9 @@ class TexExporter:
         self.fig_function_prefix = "tikz"
         self.tab_function_prefix = "tab"
         self.verbose = verbose
+        self.latex_helper = get_latex_helper() if persistent_latex else None
+        self.var_layout = var_layout
+        self.var_chunk_prefix_length = var_chunk_prefix_length
 
     def register_overleaf(
         self,
@@ -168,7 +196,9 @@ class TexExporter:
         self,
         commit_message: str = "Update from python_tex_tools",
         var_file_name: str = "python_results.tex",
-        force_overwrite: bool = False
+        force_overwrite: bool = False,
+        managed_files: List[str] = None,
+        conflict_policy: str = "block"
     ):
         """Push changes to Overleaf with conflict protection.
         
@@ -187,7 +217,17 @@ class TexExporter:
             var_file_name: The generated file to protect from conflicts
             force_overwrite: If True, skip conflict check and force push
                            (dangerous - overwrites supervisor's edits!)
+            managed_files: All generated files to protect, relative to the
+                           repository (default: only var_file_name)
+            conflict_policy: "block" stops the whole push if any managed
+                           file is blocked, "skip" keeps the remote version
+                           of blocked files and pushes all others
         """
+        if conflict_policy not in ("block", "skip"):
+            raise ValueError("conflict_policy must be either 'block' or 'skip'.")
+        if managed_files is None:
+            managed_files = [var_file_name]
+
         if not hasattr(self, "repo_path"):
             raise ValueError(
                 "No Overleaf repository registered. "
@@ -204,41 +244,33 @@ class TexExporter:
             check=True
         )
         
-        # Check if the generated file was modified remotely
-        if not force_overwrite and self._check_remote_file_conflict(var_file_name):
-            conflict_info = getattr(self, '_conflict_info', {})
-            author_name = conflict_info.get('author_name', 'Unknown')
-            author_email = conflict_info.get('author_email', '')
-            time_ago = conflict_info.get('time_ago', 'recently')
-            commit_msg = conflict_info.get('commit_msg', 'No message')
-            
-            author_display = f"{author_name} <{author_email}>" if author_email else author_name
-            
-            # Print the detailed message to console
-            print(f"\n{'='*60}")
-            print(f"🛑 UPDATES BLOCKED - FILE LOCKED BY SUPERVISOR\n")
-            print(f"The file '{var_file_name}' was last modified by:")
-            print(f"  👤 {author_display}")
-            print(f"  📅 {time_ago}")
-            print(f"  💬 {commit_msg}\n")
-            print(f"WORKFLOW:")
-            print(f"1. Your supervisor is reviewing/editing numbers in Overleaf")
-            print(f"2. When they're done, they should DELETE '{var_file_name}'")
-            print(f"   from the Overleaf project (via web interface)")
-            print(f"3. This signals: 'Ready for automated updates again'")
-            print(f"4. Re-run your script - it will push successfully\n")
-            print(f"WHY THIS APPROACH?")
-            print(f"- Prevents accidentally overwriting supervisor's edits")
-            print(f"- Explicit handoff: deletion = permission to proceed")
-            print(f"- Your numbers stay fresh, their reviews stay safe\n")
-            print(f"TO VIEW THEIR CHANGES:")
-            print(f"Check the Overleaf web interface before they delete\n")
-            print(f"TO FORCE OVERWRITE (dangerous!):")
-            print(f"Re-run with: export(force_overwrite=True)")
-            print(f"{'='*60}\n")
-            
+        # Check if any generated file was modified remotely
+        blocked_files = []
+        if not force_overwrite:
+            ownership = self._check_remote_file_conflicts(managed_files)
+            blocked_files = [
+                filename for filename, info in ownership.items()
+                if info["conflict"]
+            ]
+
+        if len(blocked_files) > 0 and conflict_policy == "block":
+            self._print_blocked_message(blocked_files, ownership)
+            author_name = ownership[blocked_files[0]]["author_name"]
             raise RuntimeError(
-                f"Push blocked: '{var_file_name}' was modified by {author_name}"
+                f"Push blocked: '{blocked_files[0]}' was modified by {author_name}"
+            )
+
+        if len(blocked_files) > 0:
+            # keep their version of the blocked files, push everything else
+            print(f"⚠ Skipping {len(blocked_files)} blocked file(s):")
+            for filename in blocked_files:
+                info = ownership[filename]
+                print(f"  {filename} (modified by {info['author_name']}, {info['time_ago']})")
+            subprocess.run(
+                ['git', 'checkout', f'origin/{self._get_current_branch()}',
+                 '--', *blocked_files],
+                cwd=self.repo_path,
+                check=True
             )
         
         # If force overwrite, reset to remote first (overwrite their changes)
@@ -335,15 +367,48 @@ class TexExporter:
         if result.stderr:
             print(result.stderr)
     
-    def _check_remote_file_conflict(self, filename: str) -> bool:
-        """Check if generated file was modified by someone else on remote.
-        
-        Returns True if file exists remotely and was last touched by someone else.
-        Only allows updates if:
-        - File doesn't exist on remote (supervisor deleted it = green light)
-        - File was last modified by us (we own it)
-        """
-        # Get current branch
+    def _print_blocked_message(self, blocked_files: List[str], ownership: dict):
+        """Explain to the user why the push was blocked."""
+        var_file_name = blocked_files[0]
+        conflict_info = ownership[var_file_name]
+        author_name = conflict_info['author_name']
+        author_email = conflict_info['author_email']
+        time_ago = conflict_info['time_ago']
+        commit_msg = conflict_info['commit_msg']
+
+        author_display = f"{author_name} <{author_email}>" if author_email else author_name
+
+        # Print the detailed message to console
+        print(f"\n{'='*60}")
+        print(f"🛑 UPDATES BLOCKED - FILE LOCKED BY SUPERVISOR\n")
+        print(f"The file '{var_file_name}' was last modified by:")
+        print(f"  👤 {author_display}")
+        print(f"  📅 {time_ago}")
+        print(f"  💬 {commit_msg}\n")
+        if len(blocked_files) > 1:
+            print(f"Further blocked files:")
+            for filename in blocked_files[1:]:
+                print(f"  {filename} ({ownership[filename]['author_name']})")
+            print("")
+        print(f"WORKFLOW:")
+        print(f"1. Your supervisor is reviewing/editing numbers in Overleaf")
+        print(f"2. When they're done, they should DELETE '{var_file_name}'")
+        print(f"   from the Overleaf project (via web interface)")
+        print(f"3. This signals: 'Ready for automated updates again'")
+        print(f"4. Re-run your script - it will push successfully\n")
+        print(f"WHY THIS APPROACH?")
+        print(f"- Prevents accidentally overwriting supervisor's edits")
+        print(f"- Explicit handoff: deletion = permission to proceed")
+        print(f"- Your numbers stay fresh, their reviews stay safe\n")
+        print(f"TO VIEW THEIR CHANGES:")
+        print(f"Check the Overleaf web interface before they delete\n")
+        print(f"TO PUSH ALL OTHER FILES:")
+        print(f"Re-run with: export(conflict_policy=\"skip\")\n")
+        print(f"TO FORCE OVERWRITE (dangerous!):")
+        print(f"Re-run with: export(force_overwrite=True)")
+        print(f"{'='*60}\n")
+
+    def _get_current_branch(self) -> str:
         result = subprocess.run(
             ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
             cwd=self.repo_path,
@@ -351,59 +416,122 @@ class TexExporter:
             text=True,
             check=True
         )
-        current_branch = result.stdout.strip()
-        
-        # Check if file exists on remote
+        return result.stdout.strip()
+
+    def _get_deleted_tracked_files(self, paths: List[str]) -> List[str]:
+        """Tracked files below paths that were deleted in the working tree."""
         result = subprocess.run(
-            ['git', 'ls-tree', f'origin/{current_branch}', '--', filename],
+            ['git', '-c', 'core.quotePath=false', 'ls-files', '--deleted',
+             '--', *paths],
             cwd=self.repo_path,
             capture_output=True,
             text=True
         )
-        
-        # If file doesn't exist on remote, allow push
-        if not result.stdout.strip():
-            print(f"✓ File '{filename}' not on remote - ready for update")
-            return False
-        
-        # File exists on remote - check who last modified it
+        return result.stdout.splitlines()
+
+    def _check_remote_file_conflicts(self, filenames: List[str]) -> dict:
+        """Resolve ownership of all generated files in one pass.
+
+        Uses a single ls-tree and a single log over origin/<branch> instead
+        of two git calls per file.
+
+        Returns a dict filename -> info with the keys exists, author_name,
+        author_email, commit_msg, time_ago and conflict. conflict is True if
+        the file exists remotely and was last touched by someone else.
+        Updates are only allowed if:
+        - File doesn't exist on remote (supervisor deleted it = green light)
+        - File was last modified by us (we own it)
+        """
+        current_branch = self._get_current_branch()
+        ownership = {
+            filename: {
+                'exists': False,
+                'author_name': 'Unknown',
+                'author_email': '',
+                'commit_msg': '',
+                'time_ago': '',
+                'conflict': False,
+            }
+            for filename in filenames
+        }
+        if len(filenames) == 0:
+            return ownership
+
+        # Check which files exist on remote
         result = subprocess.run(
-            ['git', 'log', f'origin/{current_branch}', '-1',
-             '--pretty=format:%s||%an||%ae||%ar', '--', filename],
+            ['git', '-c', 'core.quotePath=false', 'ls-tree', '-r',
+             '--name-only', f'origin/{current_branch}', '--', *filenames],
             cwd=self.repo_path,
             capture_output=True,
             text=True
         )
+        remote_files = set(result.stdout.splitlines())
+        pending = {filename for filename in filenames if filename in remote_files}
+        for filename in pending:
+            ownership[filename]['exists'] = True
+
+        # Walk the history once, newest first. The first commit touching a
+        # file is its last modification.
+        if len(pending) > 0:
+            result = subprocess.run(
+                ['git', '-c', 'core.quotePath=false', 'log',
+                 f'origin/{current_branch}', '--name-only',
+                 '--pretty=format:%x1e%s%x1f%an%x1f%ae%x1f%ar',
+                 '--', *sorted(pending)],
+                cwd=self.repo_path,
+                capture_output=True,
+                text=True
+            )
+            for record in result.stdout.split('\x1e'):
+                if not record.strip():
+                    continue
+                header, _, changed_files = record.partition('\n')
+                parts = header.split('\x1f')
+                commit_info = {
+                    'commit_msg': parts[0] if len(parts) > 0 else '',
+                    'author_name': parts[1] if len(parts) > 1 else 'Unknown',
+                    'author_email': parts[2] if len(parts) > 2 else '',
+                    'time_ago': parts[3] if len(parts) > 3 else '',
+                }
+                for filename in changed_files.splitlines():
+                    if filename in pending:
+                        ownership[filename].update(commit_info)
+                        # If last commit wasn't from us, it's a conflict
+                        ownership[filename]['conflict'] = (
+                            self.user_identifier not in commit_info['commit_msg']
+                        )
+                        pending.discard(filename)
+                if len(pending) == 0:
+                    break
+
+        for filename, info in ownership.items():
+            if not info['exists']:
+                if self.verbose:
+                    print(f"✓ File '{filename}' not on remote - ready for update")
+            elif info['conflict']:
+                print(f"⚠ Warning: Remote file '{filename}' was modified by someone else")
+                print(f"  Author: {info['author_name']} <{info['author_email']}>")
+                print(f"  When: {info['time_ago']}")
+                print(f"  Commit: {info['commit_msg']}")
+            elif self.verbose:
+                print(f"✓ File '{filename}' was last modified by us - OK to update")
+        num_ok = sum(not info['conflict'] for info in ownership.values())
+        print(f"✓ {num_ok} of {len(ownership)} generated file(s) ready for update")
+        return ownership
+
+    def _check_remote_file_conflict(self, filename: str) -> bool:
+        """Check if generated file was modified by someone else on remote.
         
-        if result.stdout.strip():
-            parts = result.stdout.strip().split('||')
-            last_commit_msg = parts[0] if len(parts) > 0 else ''
-            author_name = parts[1] if len(parts) > 1 else 'Unknown'
-            author_email = parts[2] if len(parts) > 2 else ''
-            time_ago = parts[3] if len(parts) > 3 else ''
-            
-            # Store for error message
-            self._conflict_info = {
-                'author_name': author_name,
-                'author_email': author_email,
-                'commit_msg': last_commit_msg,
-                'time_ago': time_ago
-            }
-            
-            # If last commit wasn't from us, it's a conflict
-            if self.user_identifier not in last_commit_msg:
-                print(f"⚠ Warning: Remote file was modified by someone else")
-                print(f"  Author: {author_name} <{author_email}>")
-                print(f"  When: {time_ago}")
-                print(f"  Commit: {last_commit_msg}")
-                return True
-        
-        # File exists but we last modified it - OK to update
-        print(f"✓ File '{filename}' was last modified by us - OK to update")
-        return False
+        Returns True if file exists remotely and was last touched by someone else.
+        """
+        self._conflict_info = self._check_remote_file_conflicts([filename])[filename]
+        return self._conflict_info['conflict']
 
     def add_var(self, name, value, unit_name=""):
-        self.check_name_consistency(name)
+        if self.var_layout == "keyed":
+            check_keyed_name(name)
+        else:
+            self.check_name_consistency(name)
         if not isinstance(value, str):
             value = str(value)  # Try to convert to string if it is not
         if unit_name == "":
@@ -414,22 +542,56 @@ class TexExporter:
             value = "\\SI{" + value + "}{" + unit_name + "}"
 
         self.var_list.append([name, value])
-        if self.verbose:
+        if self.verbose and self.var_layout == "keyed":
+            print(f"New Variable: \\{self.var_function_prefix}{{{name}}}")
+        elif self.verbose:
             print(f"New Variable: \\{self.var_function_prefix}{name}")
 
     def add_figure(self, name: str, figure: plt.figure):
         if TIKZPLOTLIB_AVAILABLE:
             self.add_figure_tikzplotlib(name, figure)
         else:
-            # raise NotImplementedError("tikzplotlib is not available.")
-            self.add_figure_pgfplots(name, figure)
-            
+            # write pgfplots code ourselves, the pgf backend needs LaTeX
+            try:
+                self.add_figure_native(name, figure)
+            except NotImplementedError as e:
+                if self.verbose:
+                    print(f"{e} Falling back to the pgf backend.")
+                self.add_figure_pgfplots(name, figure)
+
+    def add_figure_native(self, name: str, figure: plt.figure):
+        """Add a figure as pgfplots code written without a LaTeX process.
+
+        Supports lines, scatter, bar and errorbar plots with labels and
+        legends. Text is typeset when compiling the final document. The
+        figure is exported as <name>.pgf like in add_figure_pgfplots, but the
+        document needs \\usepackage{pgfplots}.
+
+        Raises:
+            NotImplementedError: If the figure contains unsupported artists.
+        """
+        self.check_name_consistency(name)
+        tikz_code = get_pgfplots_code(figure)
+
+        # same file as the pgf backend, so figures are included the same way
+        pgf_file_path = os.path.join(self.tmp_dir, name + ".pgf")
+        with open(pgf_file_path, "wt") as f:
+            f.write(tikz_code + "\n")
+
+        self.fig_list.append([name, pgf_file_path])
+        if self.verbose:
+            print(f"New Figure:  {name}.pgf")
+
     def add_figure_pgfplots(self, name: str, figure: plt.figure):
         self.check_name_consistency(name)
                 
         # save the figure as a pgf file in the temporary directory
         pgf_file_path = os.path.join(self.tmp_dir, name + ".pgf")
-        figure.savefig(pgf_file_path, format="pgf")
+        if self.latex_helper is not None:
+            with self.latex_helper.activate():
+                figure.savefig(pgf_file_path, format="pgf")
+        else:
+            figure.savefig(pgf_file_path, format="pgf")
         
         self.fig_list.append([name, pgf_file_path])        
         
@@ -492,11 +654,99 @@ class TexExporter:
         if any(not char.isalpha() for char in name):
             raise ValueError("Only chars are permitted in latex variable names.")
 
+    def cost_report(self, top: int = None, verbose: bool = True):
+        """Estimate the TeX cost of every entry without running TeX.
+
+        Args:
+            top (int, optional): Only print the top most expensive entries.
+                Defaults to None (print all).
+            verbose (bool, optional): Print the report. Defaults to True.
+
+        Returns:
+            list[dict]: One dict per entry (kind, name and the metrics from
+                estimate_tex_cost), sorted by bytes, most expensive first.
+        """
+        report = []
+        for kind, entries in (
+            ("var", self.var_list),
+            ("fig", self.fig_list),
+            ("tab", self.tab_list),
+        ):
+            for e in entries:
+                cost = estimate_tex_cost(read_entry_code(e[1]))
+                report.append({"kind": kind, "name": e[0], **cost})
+
+        report.sort(key=lambda entry: (entry["bytes"], entry["tokens"]),
+                    reverse=True)
+
+        if verbose and len(report) > 0:
+            print("TeX cost report:")
+            print(
+                f"{'kind':<5}{'name':<30}{'bytes':>10}{'tokens':>10}"
+                f"{'coords':>10}{'addplots':>10}{'tables':>8}{'depth':>7}"
+            )
+            for entry in report[:top]:
+                print(
+                    f"{entry['kind']:<5}{entry['name']:<30}"
+                    f"{entry['bytes']:>10}{entry['tokens']:>10}"
+                    f"{entry['coordinates']:>10}{entry['addplots']:>10}"
+                    f"{entry['tables']:>8}{entry['max_depth']:>7}"
+                )
+            print(
+                f"{'':<5}{'total':<30}"
+                f"{sum(e['bytes'] for e in report):>10}"
+                f"{sum(e['tokens'] for e in report):>10}"
+                f"{sum(e['coordinates'] for e in report):>10}"
+                f"{sum(e['addplots'] for e in report):>10}"
+                f"{sum(e['tables'] for e in report):>8}"
+            )
+        return report
+
+    def check_cost_budget(
+        self,
+        entry_budget: dict = None,
+        total_budget: dict = None,
+        on_exceeded: str = "warn"
+    ):
+        """Check the estimated TeX cost against optional budgets.
+
+        Args:
+            entry_budget (dict, optional): Maximum per entry, keyed by metric
+                (bytes, tokens, coordinates, addplots, tables, max_depth).
+                Defaults to None.
+            total_budget (dict, optional): Maximum over all entries, same
+                keys. Defaults to None.
+            on_exceeded (str, optional): "warn" prints the exceeded budgets,
+                "fail" raises a RuntimeError. Defaults to "warn".
+
+        Returns:
+            list[str]: Messages for all exceeded budgets.
+        """
+        if on_exceeded not in ("warn", "fail"):
+            raise ValueError("on_exceeded must be either 'warn' or 'fail'.")
+
+        report = self.cost_report(verbose=self.verbose)
+        violations = check_cost_budget(report, entry_budget, total_budget)
+
+        if len(violations) > 0:
+            if on_exceeded == "fail":
+                raise RuntimeError(
+                    "TeX cost budget exceeded:\n" + "\n".join(violations)
+                )
+            print("⚠ Warning: TeX cost budget exceeded")
+            for violation in violations:
+                print(f"  {violation}")
+        return violations
+
     def export(
         self,
         export_path=".",
         var_file_name="python_results.tex",
-        force_overwrite=False
+        force_overwrite=False,
+        entry_budget: dict = None,
+        total_budget: dict = None,
+        on_budget_exceeded: str = "warn",
+        conflict_policy: str = "block"
     ):
         """Export all variables, figures, and tables to LaTeX file.
         
@@ -510,7 +760,21 @@ class TexExporter:
             var_file_name: Name of the generated LaTeX file
             force_overwrite: If True, force push to Overleaf even if conflicts exist
                            (dangerous - overwrites others' edits!)
+            entry_budget: Optional TeX cost budget per entry (see
+                          check_cost_budget)
+            total_budget: Optional TeX cost budget for all entries together
+            on_budget_exceeded: "warn" or "fail" if a budget is exceeded
+            conflict_policy: "block" stops the Overleaf push if any generated
+                           file was modified by someone else, "skip" only
+                           leaves out the modified files
         """
+        if entry_budget is not None or total_budget is not None:
+            self.check_cost_budget(
+                entry_budget=entry_budget,
+                total_budget=total_budget,
+                on_exceeded=on_budget_exceeded
+            )
+
         if hasattr(self, "repo_path"):
             export_path = self.repo_path
             print(
@@ -523,22 +787,40 @@ class TexExporter:
 
         print("Writing output to %s" % var_file_path)
         f = open(var_file_path, "wt")
+        managed_files = [var_file_name]  # generated files, relative to export_path
         
         print("Exporting elements as LaTex functions. PGF files will be copied to the output directory.")
         
-        if len(self.var_list) > 0:
-            print("Variables:")
-        for i, e in enumerate(self.var_list):
-            print("\\" + self.var_function_prefix + e[0])
-            f.write(
-                "\\newcommand{\\"
-                + self.var_function_prefix
-                + e[0]
-                + "}{"
-                + e[1]
-                + "}" #+ "\\:" re enable this later!
-                + "\n"
+        if len(self.var_list) > 0 and self.var_layout == "keyed":
+            print(
+                f"Variables: {len(self.var_list)} keyed values, "
+                f"accessed by \\{self.var_function_prefix}{{name}}"
             )
+            chunk_files = write_keyed_vars(
+                f,
+                self.var_list,
+                export_path,
+                var_file_name,
+                macro=self.var_function_prefix,
+                chunk_prefix_length=self.var_chunk_prefix_length
+            )
+            managed_files += [
+                Path(os.path.relpath(chunk_file, export_path)).as_posix()
+                for chunk_file in chunk_files
+            ]
+        elif len(self.var_list) > 0:
+            print("Variables:")
+            for i, e in enumerate(self.var_list):
+                print("\\" + self.var_function_prefix + e[0])
+                f.write(
+                    "\\newcommand{\\"
+                    + self.var_function_prefix
+                    + e[0]
+                    + "}{"
+                    + e[1]
+                    + "}" #+ "\\:" re enable this later!
+                    + "\n"
+                )
             
         if len(self.fig_list) > 0:
             print("")
@@ -549,6 +831,7 @@ class TexExporter:
                     pgf_file_name = os.path.basename(e[0] + ".pgf")
                     pgf_file_path = os.path.join(export_path, pgf_file_name)
                     shutil.copy(e[1], pgf_file_path)
+                    managed_files.append(pgf_file_name)
                     print(pgf_file_name)
                 else:
                     print("\\" + self.fig_function_prefix + e[0])
@@ -578,12 +861,30 @@ class TexExporter:
             )
         f.close()
 
+        # files of earlier exports that are gone now (e.g. removed chunks)
+        # are pushed as deletions, so they need the ownership check as well
+        removed_files = [
+            filename for filename in getattr(self, "managed_files", [])
+            if filename not in managed_files
+            and not os.path.exists(os.path.join(export_path, filename))
+        ]
+        if hasattr(self, "repo_path"):
+            removed_files += [
+                filename for filename in self._get_deleted_tracked_files(
+                    [chunk_dir_name_for(var_file_name)]
+                )
+                if filename not in removed_files
+            ]
+        self.managed_files = managed_files
+
         if hasattr(self, "repo_path"):
             print("")
             print("Export complete. Pushing to overleaf.")
             self.push_to_overleaf(
                 var_file_name=var_file_name,
-                force_overwrite=force_overwrite
+                force_overwrite=force_overwrite,
+                managed_files=managed_files + removed_files,
+                conflict_policy=conflict_policy
             )
         
     def __del__(self):
@@ -0,0 +1,135 @@
+import os
+import re
+
+
+# a control sequence (\foo or \@) is a single TeX token, every other
+# non-space character is one token as well
+TEX_TOKEN_REGEX = re.compile(r"\\[A-Za-z@]+|\\.|\S")
+
+# pgfplots "coordinates {(x,y) ...}" entries and pgf backend points
+COORDINATE_REGEX = re.compile(r"\([^(){}\\]*,[^(){}\\]*\)|\\pgfqpoint\b")
+
+ADDPLOT_REGEX = re.compile(r"\\addplot\b")
+TABLE_REGEX = re.compile(r"\btable\s*(\[[^\]]*\])?\s*\{")
+
+COST_METRICS = ("bytes", "tokens", "coordinates", "addplots", "tables", "max_depth")
+
+
+def _count_table_rows(code: str):
+    """Count the data rows of all inline pgfplots tables in code."""
+    rows = 0
+    for match in TABLE_REGEX.finditer(code):
+        depth = 1
+        i = match.end()
+        start = i
+        while i < len(code) and depth > 0:
+            if code[i] == "{":
+                depth += 1
+            elif code[i] == "}":
+                depth -= 1
+            i += 1
+        body = code[start:i - 1]
+        # rows are separated by newlines or by \\ (table_row_sep)
+        lines = [
+            line for line in re.split(r"\\\\|\n", body) if line.strip()
+        ]
+        # the first line of an inline table holds the column names
+        rows += max(len(lines) - 1, 0)
+    return rows
+
+
+def _max_brace_depth(code: str):
+    """Deepest nesting of TeX groups ({...}) in code."""
+    depth = 0
+    max_depth = 0
+    escaped = False
+    for char in code:
+        if escaped:
+            escaped = False
+            continue
+        if char == "\\":
+            escaped = True
+        elif char == "{":
+            depth += 1
+            max_depth = max(max_depth, depth)
+        elif char == "}":
+            depth -= 1
+    return max_depth
+
+
+def estimate_tex_cost(code: str):
+    """Estimate the cost of a piece of TeX code without running TeX.
+
+    Args:
+        code (str): The TeX code (or the content of a .pgf file).
+
+    Returns:
+        dict: bytes, tokens, coordinates, addplots, tables and max_depth of
+            the code.
+    """
+    return {
+        "bytes": len(code.encode("utf-8")),
+        "tokens": len(TEX_TOKEN_REGEX.findall(code)),
+        "coordinates": (
+            len(COORDINATE_REGEX.findall(code)) + _count_table_rows(code)
+        ),
+        "addplots": len(ADDPLOT_REGEX.findall(code)),
+        "tables": len(TABLE_REGEX.findall(code)),
+        "max_depth": _max_brace_depth(code),
+    }
+
+
+def read_entry_code(payload: str):
+    """Return the TeX code of a fig_list/tab_list/var_list payload.
+
+    Figures exported with the pgf backend are stored as a path to a .pgf
+    file, all other payloads are TeX code already.
+    """
+    if payload.endswith(".pgf") and os.path.isfile(payload):
+        with open(payload, "rt") as f:
+            return f.read()
+    return payload
+
+
+def check_cost_budget(report: list, entry_budget: dict = None,
+                      total_budget: dict = None):
+    """Compare a cost report against per-entry and total budgets.
+
+    Args:
+        report (list): Output of TexExporter.cost_report().
+        entry_budget (dict, optional): Maximum value per metric for a single
+            entry, e.g. {"bytes": 1e6}. Defaults to None.
+        total_budget (dict, optional): Maximum value per metric summed over
+            all entries. Defaults to None.
+
+    Returns:
+        list[str]: One message for every exceeded budget.
+    """
+    for budget in (entry_budget, total_budget):
+        if budget is None:
+            continue
+        for key in budget:
+            if key not in COST_METRICS:
+                raise ValueError(
+                    f"Unsupported key {key}. Supported Keys are: {COST_METRICS}"
+                )
+
+    violations = []
+    if entry_budget is not None:
+        for entry in report:
+            for key, limit in entry_budget.items():
+                if entry[key] > limit:
+                    violations.append(
+                        f"{entry['kind']} '{entry['name']}': "
+                        f"{key} = {entry[key]} exceeds budget of {limit}"
+                    )
+
+    if total_budget is not None:
+        for key, limit in total_budget.items():
+            total = sum(entry[key] for entry in report) if key != "max_depth" \
+                else max((entry[key] for entry in report), default=0)
+            if total > limit:
+                violations.append(
+                    f"total: {key} = {total} exceeds budget of {limit}"
+                )
+    return violations
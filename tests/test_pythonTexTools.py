@@ -2,8 +2,17 @@ import unittest
 import os
 import matplotlib.pyplot as plt
 import numpy as np
-from python_tex_tools import TexExporter, make_plt_look_like_latex
+from python_tex_tools import TexExporter, NotebookExporter, make_plt_look_like_latex
+from python_tex_tools.pgfplots_writer import get_pgfplots_code
+from python_tex_tools import latex_helper
+from python_tex_tools.latex_helper import LatexHelper
+from python_tex_tools.keyed_vars import KEYED_MAX_BUCKET_SIZE, bucket_prefix_length_for, chunk_file_name_for
+from python_tex_tools.notebook_exporter import _figure_fingerprint
+from matplotlib.backends.backend_pgf import LatexManager
+from matplotlib.ticker import PercentFormatter
 import shutil
+import subprocess
+from collections import Counter
 from pandas import DataFrame
 
 class TestPythonTexTools(unittest.TestCase):
@@ -28,6 +37,306 @@ class TestPythonTexTools(unittest.TestCase):
         test_exporter.export(export_path=self.test_folder, var_file_name=self.res_file_name)
         self.assertTrue(os.path.isfile(self.res_file_path))
 
+    def test_native_figure(self):
+        test_exporter = TexExporter()
+
+        with make_plt_look_like_latex():
+            fig = plt.figure()
+            ax = fig.add_subplot(1, 1, 1)
+            ax.errorbar([1, 2, 3], [1, 4, 9], yerr=[0.1, 0.2, 0.3], label="Error", capsize=2)
+            ax.bar(["A", "B"], [3, 5], label="Bar")
+            ax.scatter([0.5], [2], label="Scatter")
+            ax.set_xlabel("$x$")
+            ax.legend()
+
+        test_exporter.add_figure_native("TestFigure", fig)
+        # written as TestFigure.pgf like figures of the pgf backend
+        self.assertTrue(test_exporter.fig_list[0][1].endswith("TestFigure.pgf"))
+        with open(test_exporter.fig_list[0][1]) as f:
+            tikz_code = f.read()
+        self.assertIn("xlabel={$x$}", tikz_code)
+        self.assertIn("xticklabels={{A},{B}}", tikz_code)
+        self.assertEqual(tikz_code.count("\\addlegendentry"), 3)
+        self.assertIn("rectangle", tikz_code)
+
+        # special characters outside of math are escaped without usetex
+        with plt.rc_context({"text.usetex": False}):
+            fig = plt.figure()
+            ax = fig.add_subplot(1, 1, 1)
+            ax.plot([0, 1], [0, 1], label="loss_total 50%")
+            ax.set_xlabel("loss_total $x_1$")
+            ax.legend()
+            tikz_code = get_pgfplots_code(fig)
+        self.assertIn("xlabel={loss\\_total $x_1$}", tikz_code)
+        self.assertIn("\\addlegendentry{loss\\_total 50\\%}", tikz_code)
+
+        # legend entries of the legend itself, marker colors, alpha and ticks
+        fig = plt.figure()
+        ax = fig.add_subplot(1, 1, 1)
+        ax.plot([0, 1], [0, 1], "o-", mfc="none", alpha=0.5)
+        ax.plot([0, 1], [1, 0])
+        ax.set_xticks([0, 0.5, 1])
+        ax.legend(["a", "b"])
+        tikz_code = get_pgfplots_code(fig)
+        self.assertEqual(tikz_code.count("\\addlegendentry"), 2)
+        self.assertIn("mark=o,", tikz_code)
+        self.assertIn("opacity=0.5", tikz_code)
+        self.assertIn("xtick={0,0.5,1}", tikz_code)
+
+        for plot in (
+            lambda ax: ax.imshow(np.random.rand(2, 2)),
+            lambda ax: ax.axhline(2),
+            lambda ax: ax.step([0, 1], [0, 1]),
+            lambda ax: ax.scatter([0], [0], marker="h"),
+            lambda ax: ax.scatter([0, 1, 2], [0, 1, 2], c=[0.0, 1.0, 2.0]),
+            lambda ax: ax.plot(np.array(["2024-01-01", "2024-01-02"], dtype="datetime64[D]"), [0, 1]),
+            lambda ax: ax.twinx().plot([0, 1], [1, 0]),
+            lambda ax: ax.yaxis.set_major_formatter(PercentFormatter()),
+            lambda ax: ax.minorticks_on(),
+            lambda ax: ax.bar([], [], label="Empty"),
+            lambda ax: ax.errorbar([0, 1], [0, 1], yerr=[0.1, 0.1], fmt="none"),
+        ):
+            fig = plt.figure()
+            plot(fig.add_subplot(1, 1, 1))
+            with self.assertRaises(NotImplementedError):
+                get_pgfplots_code(fig)
+
+        fig = plt.figure()
+        fig.add_subplot(1, 1, 1, projection="polar").plot([0, 1], [1, 2])
+        with self.assertRaises(NotImplementedError):
+            get_pgfplots_code(fig)
+
+    def test_latex_helper_metric_cache(self):
+        helper = LatexHelper(cache_dir=self.test_folder)
+        helper.metrics["header"] = {"\\rmfamily Text": (10.0, 7.0, 1.0)}
+        helper._dirty = True
+        helper.save_metrics()
+
+        # a second process (worker) finds the metrics of the first one
+        other_helper = LatexHelper(cache_dir=self.test_folder)
+        other_helper._load_metrics("header")
+        self.assertEqual(
+            other_helper.metrics["header"]["\\rmfamily Text"], [10.0, 7.0, 1.0]
+        )
+
+    def test_latex_helper_format(self):
+        # a fake pdflatex that writes the format of its job name
+        bin_dir = os.path.join(self.test_folder, "bin")
+        os.makedirs(bin_dir, exist_ok=True)
+        fake_latex = os.path.join(bin_dir, "pdflatex")
+        with open(fake_latex, "wt") as f:
+            f.write(
+                "#!/bin/sh\n"
+                "for arg in \"$@\"; do case $arg in -jobname=*) "
+                "touch \"${arg#-jobname=}.fmt\";; esac; done\n"
+            )
+        os.chmod(fake_latex, 0o755)
+
+        cache_dir = os.path.join(self.test_folder, "latex_helper_cache")
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        helper = LatexHelper(cache_dir=cache_dir)
+        path = os.environ["PATH"]
+        os.environ["PATH"] = bin_dir + os.pathsep + path
+        try:
+            with plt.rc_context({"pgf.texsystem": "pdflatex"}):
+                format_path = helper._get_format("\\documentclass{article}\n\\begin{document}")
+        finally:
+            os.environ["PATH"] = path
+
+        # built under a name of this process, then moved into place
+        self.assertEqual(os.listdir(cache_dir), [os.path.basename(format_path) + ".fmt"])
+
+    def test_latex_helper_activate(self):
+        helper = LatexHelper(cache_dir=self.test_folder)
+        manager = object()
+        helper.get_manager = lambda: manager
+        original = LatexManager.__dict__["_get_cached_or_new"]
+
+        with helper.activate():
+            self.assertIs(LatexManager._get_cached_or_new(), manager)
+        self.assertIs(LatexManager.__dict__["_get_cached_or_new"], original)
+
+        with self.assertRaises(ZeroDivisionError):
+            with helper.activate():
+                1 / 0
+        self.assertIs(LatexManager.__dict__["_get_cached_or_new"], original)
+
+        # unknown matplotlib internals: plain savefig, nothing is routed
+        internals_available = latex_helper.MATPLOTLIB_INTERNALS_AVAILABLE
+        latex_helper.MATPLOTLIB_INTERNALS_AVAILABLE = False
+        try:
+            with helper.activate():
+                self.assertIs(LatexManager.__dict__["_get_cached_or_new"], original)
+        finally:
+            latex_helper.MATPLOTLIB_INTERNALS_AVAILABLE = internals_available
+
+    def test_keyed_vars(self):
+        test_exporter = TexExporter(var_layout="keyed", var_chunk_prefix_length=4)
+        for i in range(3):
+            test_exporter.add_var(f"run_{i}.loss", i)
+        test_exporter.add_var("acc1", 0.9)
+
+        with self.assertRaises(ValueError):
+            test_exporter.add_var("run 1", 1)
+
+        test_exporter.export(export_path=self.test_folder, var_file_name=self.res_file_name)
+        with open(self.res_file_path) as f:
+            var_file = f.read()
+        self.assertNotIn("\\newcommand", var_file)
+        self.assertIn("\\prop_gput:Nnx \\g__pytex_chunk_prop {run_}", var_file)
+
+        chunk_dir = os.path.join(self.test_folder, "python_results_vars")
+        run_chunk = chunk_file_name_for("run_")
+        self.assertEqual(
+            sorted(os.listdir(chunk_dir)),
+            sorted([run_chunk, chunk_file_name_for("acc1")]),
+        )
+        with open(os.path.join(chunk_dir, run_chunk)) as f:
+            # chunks are read inside of a paragraph, line ends add no spaces
+            self.assertIn("\\PythonTexVar{run_2.loss}{\\num{2}}%\n", f.read())
+
+        # a new prefix does not rename the existing chunks
+        test_exporter.add_var("aaaa", 1)
+        test_exporter.export(export_path=self.test_folder, var_file_name=self.res_file_name)
+        self.assertIn(run_chunk, os.listdir(chunk_dir))
+
+        # the property lists of many run IDs stay short
+        names = [f"run_{i:05d}" for i in range(50000)] + ["acc"]
+        prefix_length = bucket_prefix_length_for(names)
+        bucket_sizes = Counter(name[:prefix_length] for name in names)
+        self.assertLessEqual(max(bucket_sizes.values()), KEYED_MAX_BUCKET_SIZE)
+        self.assertEqual(prefix_length, 7)
+
+        test_exporter = TexExporter(var_layout="keyed")
+        for name in names[:1000]:
+            test_exporter.add_var(name, 1)
+        test_exporter.export(export_path=self.test_folder, var_file_name=self.res_file_name)
+        with open(self.res_file_path) as f:
+            self.assertIn("\\int_gset:Nn \\g__pytex_prefix_length_int { 7 }", f.read())
+
+    def test_remote_file_ownership(self):
+        remote_path = os.path.join(self.test_folder, "remote.git")
+        repo_path = os.path.join(self.test_folder, "mirror")
+        subprocess.run(["git", "init", "-q", "--bare", remote_path], check=True)
+        subprocess.run(["git", "clone", "-q", remote_path, repo_path], check=True)
+
+        def commit(filename, message, author):
+            with open(os.path.join(repo_path, filename), "wt") as f:
+                f.write(message)
+            subprocess.run(["git", "add", filename], cwd=repo_path, check=True)
+            subprocess.run(
+                ["git", "-c", f"user.name={author}", "-c", "user.email=a@b.c",
+                 "commit", "-q", "-m", message],
+                cwd=repo_path,
+                check=True,
+            )
+
+        commit("python_results.tex", "Update [python_tex_tools]", "Student")
+        commit("FigA.pgf", "Update [python_tex_tools]", "Student")
+        commit("FigA.pgf", "Fix labels", "Supervisor")
+        subprocess.run(["git", "push", "-q", "origin", "HEAD"], cwd=repo_path, check=True)
+
+        test_exporter = TexExporter()
+        test_exporter.repo_path = repo_path
+        test_exporter.user_identifier = "python_tex_tools"
+        ownership = test_exporter._check_remote_file_conflicts(
+            ["python_results.tex", "FigA.pgf", "FigB.pgf"]
+        )
+
+        self.assertFalse(ownership["python_results.tex"]["conflict"])
+        self.assertTrue(ownership["FigA.pgf"]["conflict"])
+        self.assertEqual(ownership["FigA.pgf"]["author_name"], "Supervisor")
+        self.assertFalse(ownership["FigB.pgf"]["exists"])
+
+        # a chunk edited by the supervisor is kept, even if the export drops it
+        chunk_dir = os.path.join(repo_path, "python_results_vars")
+        os.makedirs(chunk_dir)
+        old_chunk = "python_results_vars/" + chunk_file_name_for("old_")
+        commit(old_chunk, "Fix value", "Supervisor")
+        subprocess.run(["git", "push", "-q", "origin", "HEAD"], cwd=repo_path, check=True)
+        subprocess.run(["git", "config", "user.name", "Student"], cwd=repo_path, check=True)
+        subprocess.run(["git", "config", "user.email", "a@b.c"], cwd=repo_path, check=True)
+
+        test_exporter = TexExporter(var_layout="keyed", var_chunk_prefix_length=4)
+        test_exporter.repo_path = repo_path
+        test_exporter.git_repo_url = remote_path
+        test_exporter.auth_token = ""
+        test_exporter.user_identifier = "python_tex_tools"
+        test_exporter.add_var("new_1", 1)
+        test_exporter.export(conflict_policy="skip")
+
+        self.assertTrue(os.path.isfile(os.path.join(repo_path, old_chunk)))
+        result = subprocess.run(
+            ["git", "ls-tree", "-r", "--name-only",
+             f"origin/{test_exporter._get_current_branch()}"],
+            cwd=repo_path, capture_output=True, text=True, check=True,
+        )
+        self.assertIn(old_chunk, result.stdout.splitlines())
+        self.assertIn(
+            "python_results_vars/" + chunk_file_name_for("new_"),
+            result.stdout.splitlines(),
+        )
+
+    def test_notebook_exporter(self):
+        test_exporter = NotebookExporter(
+            auto_export=False,
+            export_kwargs={"export_path": self.test_folder, "var_file_name": self.res_file_name},
+        )
+
+        # re-running a cell replaces its entries
+        for value in (1, 2):
+            test_exporter.add_var("First", value)
+            test_exporter.add_var("Second", 3)
+        self.assertEqual(test_exporter.var_list, [["First", "\\num{2}"], ["Second", "\\num{3}"]])
+
+        fig = plt.figure()
+        ax = fig.add_subplot(1, 1, 1)
+        ax.plot([0, 1], [0, 1])
+        test_exporter.add_figure("TestFigure", fig)
+        test_exporter._export_in_background()
+        self.assertTrue(os.path.isfile(self.res_file_path))
+        self.assertFalse(test_exporter.dirty)
+
+        # an unchanged figure does not trigger an export, any change does
+        test_exporter.add_figure("TestFigure", fig)
+        self.assertFalse(test_exporter.dirty)
+        ax.grid(True)
+        test_exporter.add_figure("TestFigure", fig)
+        self.assertTrue(test_exporter.dirty)
+
+        # all figure methods replace the entry of an earlier run
+        test_exporter.add_figure_native("TestFigure", fig)
+        test_exporter.add_figure_native("TestFigure", fig)
+        self.assertEqual(len(test_exporter.fig_list), 1)
+
+        # an export from a cell cancels the pending background export
+        test_exporter.add_var("First", 3)
+        test_exporter.debounce = 60
+        test_exporter._post_run_cell()
+        test_exporter.export(**test_exporter.export_kwargs)
+        self.assertTrue(test_exporter.timer.finished.is_set())
+        self.assertFalse(test_exporter.dirty)
+
+        test_exporter.close()
+        with self.assertRaises(RuntimeError):
+            test_exporter.add_figure_pgfplots("TestFigure", fig)
+
+        # the opt-in fingerprint of pgf figures covers the rendered properties
+        line = ax.lines[0]
+        line.set_label("Line")
+        ax.legend()
+        fingerprint = _figure_fingerprint(fig)
+        for change in (
+            lambda: ax.grid(False),
+            lambda: ax.set_xticks([0, 1], labels=["a", "b"]),
+            lambda: line.set_alpha(0.5),
+            lambda: line.set_drawstyle("steps"),
+            lambda: ax.legend(loc="lower left"),
+        ):
+            change()
+            self.assertNotEqual(_figure_fingerprint(fig), fingerprint)
+            fingerprint = _figure_fingerprint(fig)
+
     def test_table(self):
         tab_size = 3
         test_exporter = TexExporter()
@@ -56,6 +365,29 @@ class TestPythonTexTools(unittest.TestCase):
         test_exporter.export(export_path=self.test_folder, var_file_name=self.res_file_name)
         self.assertTrue(os.path.isfile(self.res_file_path))
 
+    def test_cost_report(self):
+        test_exporter = TexExporter()
+        test_exporter.add_var("SmallValue", 1)
+        test_exporter.fig_list.append([
+            "BigFigure",
+            "\\begin{axis}\\addplot coordinates {(0,1) (1,2) (2,3)};"
+            "\\addplot table {x y\\\\ 0 1\\\\ 1 2\\\\};\\end{axis}",
+        ])
+
+        report = test_exporter.cost_report()
+        self.assertEqual(report[0]["name"], "BigFigure")
+        self.assertEqual(report[0]["addplots"], 2)
+        self.assertEqual(report[0]["coordinates"], 5)
+
+        with self.assertRaises(RuntimeError):
+            test_exporter.export(
+                export_path=self.test_folder,
+                var_file_name=self.res_file_name,
+                entry_budget={"addplots": 1},
+                on_budget_exceeded="fail",
+            )
+        self.assertFalse(os.path.isfile(self.res_file_path))
+
     def tearDown(self) -> None:
         if os.path.exists(self.test_folder):
             shutil.rmtree(self.test_folder)